@@ -1,12 +1,28 @@
+import asyncio
+import hashlib
 import logging
 import aiohttp
-from config import API_URL, HOMEPAGE_URL, PREFERENCES_URL, HEADERS
+import orjson
+from config import (
+    API_URL, HOMEPAGE_URL, PREFERENCES_URL, HEADERS,
+    API_CONNECTION_LIMIT, API_CONNECTION_LIMIT_PER_HOST, API_DNS_CACHE_TTL,
+    API_KEEPALIVE_TIMEOUT, API_TIMEOUT, API_CONNECT_TIMEOUT, API_RETRIES, API_RETRY_BACKOFF
+)
 
 logger = logging.getLogger(__name__)
 
+# Applies to every request made through the API session
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=API_TIMEOUT, connect=API_CONNECT_TIMEOUT)
+
 # Global session for API requests
 api_session = None
 
+# Validators from the last successful products response, used for conditional requests
+_last_etag = None
+_last_modified = None
+_last_payload_hash = None
+_last_products = []
+
 async def refresh_cookie(session):
     """Get and validate session cookie"""
     try:
@@ -40,13 +56,23 @@ async def refresh_cookie(session):
         logger.error(f"Error refreshing cookie: {e}")
         return False
 
+def create_api_session():
+    """Create a pooled API session that is reused for the process lifetime"""
+    connector = aiohttp.TCPConnector(
+        limit=API_CONNECTION_LIMIT,
+        limit_per_host=API_CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=API_DNS_CACHE_TTL,
+        keepalive_timeout=API_KEEPALIVE_TIMEOUT
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT)
+
 async def init_api_session():
     """Initialize API session with valid cookie"""
     global api_session
-    if api_session:
-        await api_session.close()
+    # Keep a live session (and its open connections), only the cookie needs refreshing
+    if not api_session or api_session.closed:
+        api_session = create_api_session()
     
-    api_session = aiohttp.ClientSession()
     if await refresh_cookie(api_session):
         return True
     
@@ -54,9 +80,31 @@ async def init_api_session():
     api_session = None
     return False
 
-async def get_products():
-    """Fetch all products from API"""
-    global api_session
+async def _request_products(headers):
+    """Request the products API and return (status, response headers, body)
+    
+    Network errors and timeouts are retried with exponential backoff.
+    """
+    for attempt in range(API_RETRIES):
+        try:
+            async with api_session.get(API_URL, headers=headers) as response:
+                body = await response.read() if response.status == 200 else None
+                return response.status, response.headers, body
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            if attempt == API_RETRIES - 1:
+                raise
+            
+            delay = API_RETRY_BACKOFF * 2 ** attempt
+            logger.warning(f"Products request failed ({e!r}), retrying in {delay}s")
+            await asyncio.sleep(delay)
+
+async def get_products(only_if_changed=False):
+    """Fetch all products from API
+    
+    Returns None instead of the product list when only_if_changed is set
+    and the list is unchanged since the previous fetch.
+    """
+    global api_session, _last_etag, _last_modified, _last_payload_hash, _last_products
     
     try:
         # Initialize session if needed
@@ -65,29 +113,58 @@ async def get_products():
                 logger.error("Failed to initialize API session")
                 return []
         
-        async with api_session.get(API_URL, headers=HEADERS) as response:
-            if response.status != 200:
-                # Try refreshing cookie on error
-                if await refresh_cookie(api_session):
-                    async with api_session.get(API_URL, headers=HEADERS) as retry_response:
-                        if retry_response.status != 200:
-                            logger.error(f"API request failed after cookie refresh: {retry_response.status}")
-                            return []
-                        data = await retry_response.json()
-                else:
-                    logger.error(f"API request failed: {response.status}")
-                    return []
-            else:
-                data = await response.json()
+        # Ask the server to skip the body if nothing changed since the last fetch
+        headers = {**HEADERS}
+        if _last_etag:
+            headers['If-None-Match'] = _last_etag
+        if _last_modified:
+            headers['If-Modified-Since'] = _last_modified
+        
+        status, response_headers, body = await _request_products(headers)
+        if status not in (200, 304):
+            # Try refreshing cookie on error
+            if not await refresh_cookie(api_session):
+                logger.error(f"API request failed: {status}")
+                return []
             
-            products = data.get('data', [])
-            logger.info(f"Fetched {len(products)} products from API")
-            return products
+            status, response_headers, body = await _request_products(headers)
+            if status not in (200, 304):
+                logger.error(f"API request failed after cookie refresh: {status}")
+                return []
+        
+        if status == 304:
+            logger.info("Products unchanged since last fetch (304 Not Modified)")
+            return None if only_if_changed else _last_products
+        
+        # Servers without validators still let us skip decoding an identical payload
+        payload_hash = hashlib.blake2b(body, digest_size=16).digest()
+        if payload_hash == _last_payload_hash:
+            logger.info("Products unchanged since last fetch (identical payload)")
+            return None if only_if_changed else _last_products
+        
+        data = orjson.loads(body)
+        products = data.get('data', [])
+        
+        _last_etag = response_headers.get('ETag')
+        _last_modified = response_headers.get('Last-Modified')
+        _last_payload_hash = payload_hash
+        _last_products = products
+        
+        logger.info(f"Fetched {len(products)} products from API")
+        return products
 
     except Exception as e:
         logger.error(f"Failed to fetch products from API: {e}")
         return []
 
+def reset_products_cache():
+    """Forget the last products response so the next fetch is processed in full"""
+    global _last_etag, _last_modified, _last_payload_hash, _last_products
+    _last_etag = None
+    _last_modified = None
+    _last_payload_hash = None
+    _last_products = []
+
 async def cleanup():
     """Close API session"""
     global api_session
@@ -1,22 +1,26 @@
 import asyncio
 import logging
+import os
+import sys
+from collections import defaultdict
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
+from telegram.ext import AIORateLimiter, Application, CommandHandler, ContextTypes, CallbackQueryHandler
+from sqlalchemy import delete, func, inspect, select, text, update
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
-from config import BOT_TOKEN, DATABASE_URL, COMMANDS, NOTIFICATION_CHANNEL_ID
-from models import Base, Product, Subscription
-from api import get_products, init_api_session, cleanup
-from handlers import start, list_products, button_callback, my_subscriptions, stock, send_notification
-from utils import create_product_from_api, get_current_check_interval, is_downtime, get_schedule_info, get_ist_time, format_natural_duration, format_channel_notification
+from config import BOT_TOKEN, DATABASE_URL, COMMANDS, NOTIFICATION_CHANNEL_ID, NOTIFICATION_CONCURRENCY, TELEGRAM_CONNECTION_POOL_SIZE, TELEGRAM_POOL_TIMEOUT, TELEGRAM_MAX_RETRIES, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT, SCHEDULE_REFRESH_INTERVAL
+from models import Base, Product, Subscription, utc_now
+from api import get_products, init_api_session, cleanup, reset_products_cache
+from handlers import start, list_products, button_callback, my_subscriptions, stock, send_notification, invalidate_catalog_cache, start_subscription_writer, stop_subscription_writer
+from utils import classify_product, get_product_values, upsert_products, get_current_check_interval, get_next_active_time, is_downtime, get_schedule_info, get_ist_time, format_natural_duration, format_channel_notification, format_notification_message
 
 # Configure logging with IST timezone and colors
 class ColoredISTFormatter(logging.Formatter):
     def __init__(self, fmt=None):
         super().__init__(fmt)
-        self.ist = pytz.timezone('Asia/Kolkata')
+        self.ist = ZoneInfo('Asia/Kolkata')
         
         # ANSI color codes
         self.colors = {
@@ -27,6 +31,10 @@ class ColoredISTFormatter(logging.Formatter):
             'CRITICAL': '\033[35m', # Magenta
             'RESET': '\033[0m'      # Reset
         }
+        
+        # Only color terminal output, log collectors like journald get plain lines
+        self.use_color = sys.stderr.isatty() or bool(os.environ.get('FORCE_COLOR'))
+        self.reset = self.colors['RESET']
     
     def formatTime(self, record, datefmt=None):
         dt = datetime.fromtimestamp(record.created, tz=self.ist)
@@ -35,13 +43,11 @@ class ColoredISTFormatter(logging.Formatter):
     def format(self, record):
         # Get the original formatted message
         original = super().format(record)
+        if not self.use_color:
+            return original
         
-        # Add color based on log level
-        color = self.colors.get(record.levelname, self.colors['RESET'])
-        reset = self.colors['RESET']
-        
-        # Color the entire line
-        return f"{color}{original}{reset}"
+        # Color the entire line based on log level
+        return self.colors.get(record.levelname, self.reset) + original + self.reset
 
 # Configure logging
 logging.basicConfig(
@@ -61,8 +67,39 @@ logging.getLogger("telegram").setLevel(logging.WARNING)
 logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
 # Initialize database engine
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine_options = {
+    "echo": False,
+    "pool_pre_ping": True,  # Replace connections dropped by idle timeouts before handing them out
+    "pool_recycle": DB_POOL_RECYCLE,
+}
+if not DATABASE_URL.startswith("sqlite"):
+    # SQLite is a local file, only server databases benefit from a larger pool
+    engine_options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+if DATABASE_URL.startswith("postgresql+asyncpg"):
+    # The bot only runs small, simple queries, JIT compilation costs more than it saves
+    engine_options["connect_args"] = {"server_settings": {"jit": "off", "application_name": "amul_bot"}}
+
+engine = create_async_engine(DATABASE_URL, **engine_options)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Last known (available, price) per product id, lets check_stock skip unchanged products
+_stock_cache = {}
+
+# Product ids of the last committed API payload, their check time is refreshed when the payload is unchanged
+_checked_ids = []
+
+# Columns refreshed by check_stock when a product already exists
+STOCK_COLUMNS = ('price', 'available', 'last_checked', 'last_stock_change', 'last_in_stock_at', 'last_out_of_stock_at')
+
+def add_missing_columns(connection):
+    """Add model columns missing from tables created by an older version of the bot"""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Added column {table.name}.{column.name}")
 
 async def initialize():
     """Initialize database and API session"""
@@ -71,7 +108,26 @@ async def initialize():
         async with engine.begin() as conn:
             # Create all tables if they don't exist
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(add_missing_columns)
+            # Remove duplicate subscriptions left by concurrent toggles before the unique index is built
+            first_ids = select(func.min(Subscription.id)).group_by(Subscription.user_id, Subscription.product_id)
+            await conn.execute(delete(Subscription).where(Subscription.id.not_in(first_ids)))
+            # create_all skips indexes on tables that already exist
+            for index in Subscription.__table__.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
             logger.info("Database tables created/verified")
+        
+        # Classify products stored before the classification columns existed
+        async with async_session() as session:
+            result = await session.execute(select(Product.id, Product.name).where(Product.category.is_(None)))
+            rows = []
+            for product_id, name in result:
+                category, variant, pack_info = classify_product(name)
+                rows.append({"id": product_id, "category": category, "variant": variant, "pack_info": pack_info})
+            if rows:
+                await session.execute(update(Product), rows)
+                await session.commit()
+                logger.info(f"Classified {len(rows)} existing products")
                 
         logger.info("Database initialized successfully")
     except Exception as e:
@@ -86,6 +142,42 @@ async def initialize():
         logger.error("Failed to initialize API session")
         raise RuntimeError("API session initialization failed")
 
+async def send_channel_notification(context: ContextTypes.DEFAULT_TYPE, product: Product, is_available, duration_info=None, restock_info=None):
+    """Post a stock change to the notification channel"""
+    try:
+        channel_data = format_channel_notification(
+            product, is_available, duration_info, restock_info
+        )
+        
+        if channel_data['photo']:
+            # Send photo with caption
+            await context.bot.send_photo(
+                chat_id=NOTIFICATION_CHANNEL_ID,
+                photo=channel_data['photo'],
+                caption=channel_data['text'],
+                parse_mode='HTML'
+            )
+        else:
+            # Send text message if no image
+            await context.bot.send_message(
+                chat_id=NOTIFICATION_CHANNEL_ID,
+                text=channel_data['text'],
+                parse_mode='HTML',
+                disable_web_page_preview=True
+            )
+        
+        logger.info(f"Sent channel notification for {product.name}")
+    except Exception as e:
+        logger.error(f"Failed to send channel notification: {e}")
+
+async def record_check_time(session, product_ids, now_utc):
+    """Set last_checked for the given products with a single UPDATE"""
+    await session.execute(
+        update(Product)
+        .where(Product.id.in_(product_ids))
+        .values(last_checked=now_utc)
+    )
+
 async def check_stock(context: ContextTypes.DEFAULT_TYPE, force_run=False):
     """Periodic job to check stock and notify subscribers"""
     try:
@@ -96,220 +188,311 @@ async def check_stock(context: ContextTypes.DEFAULT_TYPE, force_run=False):
         elif is_downtime() and force_run:
             logger.info("Running initial stock check (forced during downtime)")
             
-        api_products = await get_products()
+        api_products = await get_products(only_if_changed=True)
+        # One timestamp for every row written by this check
+        now_utc = utc_now()
+        
+        if api_products is None:
+            # Nothing to compare, only record that the check ran so /stock's last update time stays current
+            if _checked_ids:
+                async with async_session() as session:
+                    await record_check_time(session, _checked_ids, now_utc)
+                    await session.commit()
+            logger.info("Product list unchanged, only recorded the check time")
+            return
+        
         logger.info(f"Fetched {len(api_products)} products from API")
         
         if not api_products:
             logger.warning("No products returned from API")
             return
         
+        api_by_id = {api_product['_id']: api_product for api_product in api_products}
+        
         async with async_session() as session:
             await session.begin()
             
-            for api_product in api_products:
-                from sqlalchemy import select
-                from sqlalchemy.orm import selectinload
+            # Warm the stock cache from the database on the first run
+            if not _stock_cache:
+                result = await session.execute(select(Product.id, Product.available, Product.price))
+                _stock_cache.update((product_id, (available, price)) for product_id, available, price in result)
+            
+            # Only new products or ones whose stock/price changed need any database reads
+            known_ids = [product_id for product_id in api_by_id if product_id in _stock_cache]
+            changed_ids = [
+                product_id for product_id, api_product in api_by_id.items()
+                if _stock_cache.get(product_id) != (api_product['available'] == 1, api_product['price'])
+            ]
+            
+            # Load changed products and their subscriptions in two queries
+            products_by_id = {}
+            subscriptions_by_product = defaultdict(list)
+            if changed_ids:
+                products_query = select(Product).where(Product.id.in_(changed_ids))
+                result = await session.execute(products_query)
+                products_by_id = {product.id: product for product in result.scalars()}
+                
+                # Plain rows with only the columns the loop reads, no ORM objects to build
+                subs_query = select(
+                    Subscription.id, Subscription.user_id, Subscription.product_id, Subscription.last_stock_status
+                ).where(Subscription.product_id.in_(changed_ids))
+                # Streamed so large subscriber lists are grouped as rows arrive instead of buffered first
+                async for sub in await session.stream(subs_query):
+                    subscriptions_by_product[sub.product_id].append(sub)
+            else:
+                logger.info("No stock or price changes detected")
+            
+            # Changes are collected and written with one statement per table
+            product_rows = []
+            sub_updates = []
+            channel_notifications = []
+            pending_notifications = []
+            
+            for product_id in changed_ids:
+                api_product = api_by_id[product_id]
                 
                 # Update or create product
-                product_query = select(Product).where(Product.id == api_product['_id'])
-                result = await session.execute(product_query)
-                product = result.scalar_one_or_none()
+                product = products_by_id.get(product_id)
                 
                 current_stock_status = api_product['available'] == 1
                 
+                # Every row carries the same columns so they fit one multi-row upsert
+                product_row = get_product_values(api_product)
+                product_row["last_checked"] = now_utc
+                
                 if not product:
-                    product = create_product_from_api(api_product)
-                    session.add(product)
-                    logger.info(f"Added new product: {product.name}")
+                    product_row.update(last_stock_change=None, last_in_stock_at=None, last_out_of_stock_at=None)
+                    product_rows.append(product_row)
+                    logger.info(f"Added new product: {product_row['name']}")
                 else:
-                    # Get all subscriptions for this product
-                    subs_query = select(Subscription).where(
-                        Subscription.product_id == product.id
-                    ).options(selectinload(Subscription.user))
-                    
-                    result = await session.execute(subs_query)
-                    subscriptions = result.scalars().all()
+                    subscriptions = subscriptions_by_product[product.id]
                     
                     # Track stock changes and calculate durations
                     stock_changed = product.available != current_stock_status
-                    now_utc = datetime.utcnow()
+                    price_changed = product.price != api_product['price']
                     
                     duration_info = None
                     restock_info = None
+                    product_row.update(
+                        last_stock_change=product.last_stock_change,
+                        last_in_stock_at=product.last_in_stock_at,
+                        last_out_of_stock_at=product.last_out_of_stock_at
+                    )
                     
                     if stock_changed:
                         if current_stock_status:  # Product became available
-                            product.last_in_stock_at = now_utc
+                            product_row["last_in_stock_at"] = now_utc
                             if product.last_out_of_stock_at:
                                 duration_info = format_natural_duration(product.last_out_of_stock_at, now_utc)
                                 # Calculate restock info (time since last in stock)
                                 if product.last_stock_change:
                                     restock_info = format_natural_duration(product.last_stock_change, now_utc)
                         else:  # Product went out of stock
-                            product.last_out_of_stock_at = now_utc
+                            product_row["last_out_of_stock_at"] = now_utc
                             if product.last_in_stock_at:
                                 duration_info = format_natural_duration(product.last_in_stock_at, now_utc)
                         
-                        product.last_stock_change = now_utc
+                        product_row["last_stock_change"] = now_utc
                         
-                        # Send channel notification if configured
+                        # Queue channel notification if configured
                         if NOTIFICATION_CHANNEL_ID:
-                            try:
-                                channel_data = format_channel_notification(
-                                    product, current_stock_status, duration_info, restock_info
-                                )
-                                
-                                if channel_data['photo']:
-                                    # Send photo with caption
-                                    await context.bot.send_photo(
-                                        chat_id=NOTIFICATION_CHANNEL_ID,
-                                        photo=channel_data['photo'],
-                                        caption=channel_data['text'],
-                                        parse_mode='HTML'
-                                    )
-                                else:
-                                    # Send text message if no image
-                                    await context.bot.send_message(
-                                        chat_id=NOTIFICATION_CHANNEL_ID,
-                                        text=channel_data['text'],
-                                        parse_mode='HTML',
-                                        disable_web_page_preview=True
-                                    )
-                                
-                                logger.info(f"Sent channel notification for {product.name}")
-                            except Exception as e:
-                                logger.error(f"Failed to send channel notification: {e}")
+                            channel_notifications.append((product, current_stock_status, duration_info, restock_info))
                     
-                    # Send individual user notifications
+                    # Queue individual user notifications, the message is the same for every subscriber so it is formatted once
+                    message_data = None
                     for sub in subscriptions:
                         user_stock_changed = sub.last_stock_status != current_stock_status
                         
                         if user_stock_changed:
+                            if message_data is None:
+                                message_data = format_notification_message(product, current_stock_status, duration_info)
+                            sub_update = {"id": sub.id, "last_stock_status": current_stock_status}
                             if current_stock_status:  # Product became available
-                                await send_notification(context, product, sub.user_id, True, duration_info)
-                                sub.last_notified_at = now_utc
-                                sub.notified = True
-                                logger.info(f"Notified user {sub.user_id} about {product.name} becoming available")
+                                pending_notifications.append((product, sub.user_id, True, duration_info, message_data))
+                                sub_update["last_notified_at"] = now_utc
+                                sub_update["notified"] = True
+                                logger.info(f"Notifying user {sub.user_id} about {product.name} becoming available")
                             else:  # Product went out of stock
-                                await send_notification(context, product, sub.user_id, False, duration_info)
-                                sub.notified = False  # Reset notification status for next availability
-                                logger.info(f"Notified user {sub.user_id} about {product.name} going out of stock")
+                                pending_notifications.append((product, sub.user_id, False, duration_info, message_data))
+                                sub_update["notified"] = False  # Reset notification status for next availability
+                                logger.info(f"Notifying user {sub.user_id} about {product.name} going out of stock")
                             
-                            sub.last_stock_status = current_stock_status
+                            sub_updates.append(sub_update)
                     
-                    # Update product details
-                    product.price = api_product['price']
-                    product.available = current_stock_status
-                    product.last_checked = datetime.utcnow()
+                    # Update product details, unchanged products are left untouched
+                    if stock_changed or price_changed:
+                        product_rows.append(product_row)
+            
+            # New and changed products are written with a single upsert
+            if product_rows:
+                await upsert_products(session, product_rows, STOCK_COLUMNS)
+            
+            # Bulk UPDATE by primary key for subscriptions
+            if sub_updates:
+                await session.execute(update(Subscription), sub_updates)
+            
+            # Record the check time for all known products with a single statement
+            if known_ids:
+                await record_check_time(session, known_ids, now_utc)
             
             await session.commit()
             logger.info("Stock check completed successfully")
             
-        # Schedule next check based on current time
-        schedule_next_check(context)
+            # Only remember the new state once it is committed
+            for product_id in changed_ids:
+                api_product = api_by_id[product_id]
+                _stock_cache[product_id] = (api_product['available'] == 1, api_product['price'])
+            if product_rows:
+                invalidate_catalog_cache()
+            _checked_ids[:] = api_by_id
+        
+        # Notifications go out after the commit so Telegram round-trips never hold the transaction open
+        for product, is_available, duration_info, restock_info in channel_notifications:
+            await send_channel_notification(context, product, is_available, duration_info, restock_info)
+        
+        if pending_notifications:
+            semaphore = asyncio.Semaphore(NOTIFICATION_CONCURRENCY)
+            
+            async def send_limited(product, user_id, is_available, duration_info, message_data):
+                async with semaphore:
+                    await send_notification(context, product, user_id, is_available, duration_info, message_data)
+            
+            results = await asyncio.gather(
+                *(send_limited(*notification) for notification in pending_notifications),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Notification task failed: {result}")
                 
     except Exception as e:
         logger.error(f"Error occurred during stock check: {e}")
-        # Still schedule next check even if there was an error
-        schedule_next_check(context)
+        # Make sure the next check processes the product list even if it is unchanged
+        reset_products_cache()
 
 async def initial_stock_check(context: ContextTypes.DEFAULT_TYPE):
     """Initial stock check that runs regardless of downtime"""
     await check_stock(context, force_run=True)
 
-def schedule_next_check(context):
-    """Schedule the next stock check based on current time"""
+async def refresh_check_schedule(context: ContextTypes.DEFAULT_TYPE):
+    """Re-create the repeating stock check when the schedule window changes"""
     try:
         current_interval = get_current_check_interval()
+        state = context.job.data
+        
+        # Nothing to do while we stay in the same window
+        if "interval" in state and state["interval"] == current_interval:
+            return
+        
+        resuming = "interval" in state and state["interval"] is None
+        state["interval"] = current_interval
+        
+        for job in context.job_queue.get_jobs_by_name("stock_check"):
+            job.schedule_removal()
         
         if current_interval is None:
-            # We're in downtime, schedule for when downtime ends
-            from utils import get_next_active_time
+            # We're in downtime, the job is re-created when downtime ends
             next_active = get_next_active_time()
-            
-            # Since job queue is now in IST timezone, we can schedule directly with IST datetime
-            context.job_queue.run_once(
-                check_stock,
-                when=next_active,
-                name="stock_check_resume"
-            )
-            logger.info(f"Scheduled next check after downtime at {next_active.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        else:
-            # Schedule next check with appropriate interval
-            context.job_queue.run_once(
-                check_stock,
-                when=current_interval,
-                name="stock_check_dynamic"
-            )
-            schedule_info = get_schedule_info()
-            logger.info(f"Scheduled next check: {schedule_info}")
-            
+            logger.info(f"Paused stock checks for downtime, resuming at {next_active.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+            return
+        
+        # Check right away when resuming after downtime
+        context.job_queue.run_repeating(
+            check_stock,
+            interval=current_interval,
+            first=0 if resuming else current_interval,
+            name="stock_check"
+        )
+        schedule_info = get_schedule_info()
+        logger.info(f"Scheduled stock checks: {schedule_info}")
+        
     except Exception as e:
-        logger.error(f"Error scheduling next check: {e}")
-        # Fallback to default interval
-        context.job_queue.run_once(check_stock, when=300, name="stock_check_fallback")
+        logger.error(f"Error updating check schedule: {e}")
 
-def command_wrapper(func):
-    """Wrapper to provide database session to command handlers"""
+def command_wrapper(func, readonly=False):
+    """Wrapper to provide database session to command handlers, readonly handlers commit themselves when they write"""
     async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE):
         async with async_session() as session:
-            await session.begin()
             try:
                 await func(update, context, session)
-                await session.commit()
+                # Autobegin only opens a transaction once SQL runs, skip the commit if none is pending
+                if not readonly and session.in_transaction():
+                    await session.commit()
             except Exception as e:
-                await session.rollback()
+                # Closing the session rolls back whatever the handler left uncommitted
                 logger.error(f"Error in {func.__name__}: {e}")
-                await update.message.reply_text(
+                # Callback queries carry no update.message, reply under the message their buttons belong to
+                await update.effective_message.reply_text(
                     "An error occurred. Please try again later."
                 )
     return wrapped
 
+async def post_init(application: Application):
+    """Initialize database, API session, bot commands and stock check jobs on the bot's event loop"""
+    await initialize()
+    start_subscription_writer(async_session)
+    
+    # Set bot commands, only when the menu Telegram has differs from COMMANDS
+    registered = await application.bot.get_my_commands()
+    if [(command.command, command.description) for command in registered] != list(COMMANDS.items()):
+        await application.bot.set_my_commands(list(COMMANDS.items()))
+        logger.info("Bot commands registered")
+    else:
+        logger.info("Bot commands already up to date")
+    
+    # Always run initial stock check immediately, then follow smart scheduling
+    application.job_queue.run_once(initial_stock_check, when=10, name="stock_check_initial")
+    application.job_queue.run_repeating(
+        refresh_check_schedule,
+        interval=SCHEDULE_REFRESH_INTERVAL,
+        first=0,
+        name="stock_check_schedule",
+        data={}
+    )
+    
+    current_interval = get_current_check_interval()
+    if current_interval is None:
+        next_active = get_next_active_time()
+        logger.info(f"Bot starting during downtime - initial check in 10 seconds, then resuming at {next_active.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+    else:
+        schedule_info = get_schedule_info()
+        logger.info(f"Dynamic stock checker started - initial check in 10 seconds, then: {schedule_info}")
+
+async def post_shutdown(application: Application):
+    """Flush queued subscription changes, then close the API session and database connections"""
+    await stop_subscription_writer()
+    await cleanup()
+    await engine.dispose()
+
 def main():
     """Start the bot"""
     try:
-        # Initialize everything first
-        asyncio.get_event_loop().run_until_complete(initialize())
-        
-        # Create the Application
+        # Create the Application, initialization runs on its event loop before polling starts
         application = (
             Application.builder()
             .token(BOT_TOKEN)
+            .connection_pool_size(TELEGRAM_CONNECTION_POOL_SIZE)
+            .pool_timeout(TELEGRAM_POOL_TIMEOUT)
+            # Keeps notification bursts within Telegram's global and per-chat flood limits
+            .rate_limiter(AIORateLimiter(max_retries=TELEGRAM_MAX_RETRIES))
             .concurrent_updates(True)
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
             .build()
         )
         
         # Configure job queue timezone to IST
-        IST = pytz.timezone('Asia/Kolkata')
+        IST = ZoneInfo('Asia/Kolkata')
         if application.job_queue:
             application.job_queue.scheduler.timezone = IST
 
         # Add command handlers with session wrapper
-        application.add_handler(CommandHandler("start", command_wrapper(start)))
-        application.add_handler(CommandHandler("products", command_wrapper(list_products)))
-        application.add_handler(CommandHandler("mysubs", command_wrapper(my_subscriptions)))
-        application.add_handler(CommandHandler("stock", command_wrapper(stock)))
+        application.add_handler(CommandHandler("start", command_wrapper(start, readonly=True)))
+        application.add_handler(CommandHandler("products", command_wrapper(list_products, readonly=True)))
+        application.add_handler(CommandHandler("mysubs", command_wrapper(my_subscriptions, readonly=True)))
+        application.add_handler(CommandHandler("stock", command_wrapper(stock, readonly=True)))
         application.add_handler(CallbackQueryHandler(command_wrapper(button_callback)))
 
-        # Set bot commands
-        async def set_commands():
-            await application.bot.set_my_commands([
-                (cmd, desc) for cmd, desc in COMMANDS.items()
-            ])
-        asyncio.get_event_loop().run_until_complete(set_commands())
-        logger.info("Bot commands registered")
-
-        # Always run initial stock check immediately, then follow smart scheduling
-        application.job_queue.run_once(initial_stock_check, when=10, name="stock_check_initial")
-        
-        current_interval = get_current_check_interval()
-        if current_interval is None:
-            from utils import get_next_active_time
-            next_active = get_next_active_time()
-            logger.info(f"Bot starting during downtime - initial check in 10 seconds, then resuming at {next_active.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        else:
-            schedule_info = get_schedule_info()
-            logger.info(f"Dynamic stock checker started - initial check in 10 seconds, then: {schedule_info}")
         logger.info("Bot starting...")
 
         # Start the bot
@@ -318,18 +501,6 @@ def main():
     except Exception as e:
         logger.error(f"Bot crashed: {e}")
         raise
-    finally:
-        # Cleanup API session
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If loop is still running, schedule cleanup
-                loop.create_task(cleanup())
-            else:
-                # If loop is closed, create new one for cleanup
-                asyncio.run(cleanup())
-        except Exception as cleanup_error:
-            logger.error(f"Error during cleanup: {cleanup_error}")
 
 if __name__ == '__main__':
     try:
@@ -12,19 +12,43 @@ DOWNTIME_START_HOUR = int(os.getenv("DOWNTIME_START_HOUR", "0"))         # 12am
 DOWNTIME_END_HOUR = int(os.getenv("DOWNTIME_END_HOUR", "6"))             # 6am
 PEAK_START_HOUR = int(os.getenv("PEAK_START_HOUR", "6"))                 # 6am
 PEAK_END_HOUR = int(os.getenv("PEAK_END_HOUR", "16"))                    # 4pm
+SCHEDULE_REFRESH_INTERVAL = 60                                           # Seconds between checks for schedule window changes
 
 # Notification settings
 NOTIFICATION_CHANNEL_ID = os.getenv("NOTIFICATION_CHANNEL_ID")           # Channel ID for stock notifications
+NOTIFICATION_CONCURRENCY = 20                                            # Maximum user notifications in flight at once
+
+# Telegram Bot API client settings
+TELEGRAM_CONNECTION_POOL_SIZE = 256                                      # Kept-alive connections shared by all bot requests
+TELEGRAM_POOL_TIMEOUT = 5.0                                              # Seconds a request waits for a free pooled connection
+TELEGRAM_MAX_RETRIES = 3                                                 # Retries for requests Telegram answers with RetryAfter
+RENDER_IN_EXECUTOR_THRESHOLD = 32                                        # Messages listing more items than this are built in a worker thread
 
 # Legacy config for backward compatibility
 CHECK_INTERVAL = CHECK_INTERVAL_PEAK  # Default to peak interval
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///app/data/amul_bot.db")
 
+# Database connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))                      # Persistent connections (server databases only)
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))                # Extra connections allowed under burst load
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))              # Recycle connections after 30 minutes
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))                # Seconds to wait for a free connection
+
 # API Endpoints
 API_URL = "https://shop.amul.com/api/1/entity/ms.products?fields[name]=1&fields[brand]=1&fields[categories]=1&fields[collections]=1&fields[alias]=1&fields[sku]=1&fields[price]=1&fields[compare_price]=1&fields[original_price]=1&fields[images]=1&fields[metafields]=1&fields[discounts]=1&fields[catalog_only]=1&fields[is_catalog]=1&fields[seller]=1&fields[available]=1&fields[inventory_quantity]=1&fields[net_quantity]=1&fields[num_reviews]=1&fields[avg_rating]=1&fields[inventory_low_stock_quantity]=1&fields[inventory_allow_out_of_stock]=1&filters[0][field]=categories&filters[0][value][0]=protein&filters[0][operator]=in&facets=true&facetgroup=default_category_facet&limit=100&total=1&start=0"
 HOMEPAGE_URL = "https://shop.amul.com/en/"
 PREFERENCES_URL = "https://shop.amul.com/entity/ms.settings/_/setPreferences"
 
+# API client settings
+API_CONNECTION_LIMIT = 50              # Total open connections
+API_CONNECTION_LIMIT_PER_HOST = 20     # Open connections per host
+API_DNS_CACHE_TTL = 300                # Seconds to cache DNS lookups
+API_KEEPALIVE_TIMEOUT = 75             # Seconds to keep idle connections alive
+API_TIMEOUT = 10                       # Total seconds allowed per request
+API_CONNECT_TIMEOUT = 5                # Seconds allowed to establish a connection
+API_RETRIES = 3                        # Attempts per products request on network errors/timeouts
+API_RETRY_BACKOFF = 0.5                # Seconds before the first retry, doubled for each further retry
+
 # Request headers
 HEADERS = {
     "accept": "application/json, text/plain, */*",
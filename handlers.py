@@ -1,16 +1,239 @@
+import asyncio
 import logging
+import time
+from collections import OrderedDict
+from weakref import WeakValueDictionary
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, constants
 from telegram.ext import ContextTypes
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.orm import joinedload, raiseload
 
-from models import Product, User, Subscription
-from config import CHECK_INTERVAL
-from utils import categorize_products, format_notification_message, format_stock_message, create_product_from_api
+from models import Product, User, Subscription, utc_now
+from config import CHECK_INTERVAL, RENDER_IN_EXECUTOR_THRESHOLD
+from utils import MESSAGE_SEPARATOR, STOCK_STATUS_IN, STOCK_STATUS_OUT, categorize_products, format_notification_message, format_stock_body, format_stock_message, get_product_values, insert_subscriptions, upsert_products
 from api import get_products
 
 logger = logging.getLogger(__name__)
 
+# Seconds the shared product list is reused before it is reloaded
+CATALOG_CACHE_TTL = 60
+
+# Columns refreshed when list_products saves a product that already exists
+PRODUCT_REFRESH_COLUMNS = ('price', 'available', 'last_checked')
+
+# Only the columns the menus and categorize_products read
+CATALOG_COLUMNS = (Product.id, Product.name, Product.price, Product.available, Product.alias,
+                   Product.category, Product.variant, Product.pack_info)
+
+# Product list shared by all users, the generation is bumped whenever stock changes are committed
+_catalog_cache = {"generation": 0, "products": None, "by_id": None, "categories": None, "keyboard": None, "stock_body": None, "loaded_at": 0.0}
+
+# Text shown above the category buttons
+CATEGORIES_MESSAGE = (
+    "🛒 <b>Product Categories</b>\n\n"
+    "📱 Select a category to view products and subscribe\n"
+    "🟢 = Has available items | 🔴 = All out of stock\n"
+    "Numbers show (available/total) products"
+)
+
+def invalidate_catalog_cache():
+    """Drop the cached product list so the next request reloads it"""
+    _catalog_cache["generation"] += 1
+    _catalog_cache["products"] = None
+    _catalog_cache["by_id"] = None
+    _catalog_cache["categories"] = None
+    _catalog_cache["keyboard"] = None
+    _catalog_cache["stock_body"] = None
+
+async def get_catalog(session):
+    """Return all products as read-only rows, hitting the database at most once per CATALOG_CACHE_TTL"""
+    while _catalog_cache["products"] is None or time.monotonic() - _catalog_cache["loaded_at"] > CATALOG_CACHE_TTL:
+        generation = _catalog_cache["generation"]
+        
+        # Plain rows on a connection of their own, so a rollback of the handler's session can't expire them
+        # and a retry below reads a fresh snapshot
+        async with session.bind.connect() as connection:
+            result = await connection.execute(select(*CATALOG_COLUMNS))
+            products = result.all()
+        
+        # Stock changes were committed while loading, these rows may predate them so load again
+        if _catalog_cache["generation"] != generation:
+            continue
+        
+        _catalog_cache["products"] = products
+        _catalog_cache["by_id"] = {product.id: product for product in products}
+        _catalog_cache["categories"] = None
+        _catalog_cache["loaded_at"] = time.monotonic()
+    return _catalog_cache["products"]
+
+# Seconds the subscription writer waits for more toggles before writing a batch
+SUBSCRIPTION_BATCH_DELAY = 0.05
+
+# Queued (user_id, product_id, row, future) toggles, a row subscribes and None unsubscribes,
+# the writer fills in the row's stock status when it is written
+_subscription_queue = asyncio.Queue()
+_subscription_writer = None
+
+async def queue_subscription_change(user_id, product_id, row=None):
+    """Queue a subscribe (row given) or unsubscribe and wait until its batch is committed"""
+    future = asyncio.get_running_loop().create_future()
+    await _subscription_queue.put((user_id, product_id, row, future))
+    await future
+
+async def apply_subscription_changes(session_factory, changes):
+    """Write {(user_id, product_id): row or None} subscription changes in one transaction"""
+    adds = [row for row in changes.values() if row is not None]
+    removes = [pair for pair, row in changes.items() if row is None]
+    
+    async with session_factory() as session:
+        if adds:
+            # Stock status is read in this transaction, the cached catalog may predate a stock check that
+            # committed while the toggle waited, and check_stock only revisits products whose stock changes
+            product_ids = {row["product_id"] for row in adds}
+            result = await session.execute(select(Product.id, Product.available).where(Product.id.in_(product_ids)))
+            available_by_id = dict(result.all())
+            adds = [
+                {
+                    **row,
+                    "last_stock_status": available_by_id.get(row["product_id"], False),
+                    "notified": available_by_id.get(row["product_id"], False)  # If product is available, mark as notified
+                }
+                for row in adds
+            ]
+            await insert_subscriptions(session, adds)
+        if removes:
+            await session.execute(delete(Subscription).where(
+                tuple_(Subscription.user_id, Subscription.product_id).in_(removes)
+            ))
+        await session.commit()
+
+async def write_subscription_changes(session_factory):
+    """Write queued subscription toggles in batches, one transaction per batch"""
+    while True:
+        batch = [await _subscription_queue.get()]
+        # Give concurrent taps a moment to join this batch
+        await asyncio.sleep(SUBSCRIPTION_BATCH_DELAY)
+        while not _subscription_queue.empty():
+            batch.append(_subscription_queue.get_nowait())
+        
+        # The last toggle for a user/product pair wins
+        changes = {(user_id, product_id): row for user_id, product_id, row, _ in batch}
+        errors = {}
+        
+        try:
+            await apply_subscription_changes(session_factory, changes)
+        except Exception as e:
+            if len(changes) == 1:
+                logger.error(f"Failed to write subscription change: {e}")
+                errors = dict.fromkeys(changes, e)
+            else:
+                # Write the changes one by one so a bad row only fails its own toggle
+                logger.warning(f"Failed to write {len(changes)} subscription changes together, retrying one by one: {e}")
+                for pair, row in changes.items():
+                    try:
+                        await apply_subscription_changes(session_factory, {pair: row})
+                    except Exception as e:
+                        logger.error(f"Failed to write subscription change for user {pair[0]}: {e}")
+                        errors[pair] = e
+        
+        for user_id, product_id, _, future in batch:
+            if not future.done():
+                error = errors.get((user_id, product_id))
+                if error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(None)
+            _subscription_queue.task_done()
+
+def start_subscription_writer(session_factory):
+    """Start the background task that writes queued subscription toggles"""
+    global _subscription_writer
+    _subscription_writer = asyncio.create_task(write_subscription_changes(session_factory))
+
+async def stop_subscription_writer():
+    """Stop the subscription writer once all queued toggles are written"""
+    if _subscription_writer:
+        await _subscription_queue.join()
+        _subscription_writer.cancel()
+
+# Users whose subscribed product ids are kept in memory, the least recently used are dropped first
+SUBSCRIPTION_CACHE_SIZE = 1000
+
+# user_id -> set of subscribed product ids, only changed by toggles once their write is committed
+_user_subscriptions = OrderedDict()
+_user_locks = WeakValueDictionary()
+
+def user_lock(user_id):
+    """Return the lock that serializes subscription reads and toggles for a user"""
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = _user_locks[user_id] = asyncio.Lock()
+    return lock
+
+async def load_user_subscriptions(session, user_id):
+    """Return the cached set of product ids a user is subscribed to, the caller must hold user_lock"""
+    subscribed_ids = _user_subscriptions.get(user_id)
+    if subscribed_ids is None:
+        subs_query = select(Subscription.product_id).where(Subscription.user_id == user_id)
+        subscribed_ids = set(await session.scalars(subs_query))
+        _user_subscriptions[user_id] = subscribed_ids
+        if len(_user_subscriptions) > SUBSCRIPTION_CACHE_SIZE:
+            _user_subscriptions.popitem(last=False)
+    else:
+        _user_subscriptions.move_to_end(user_id)
+    return subscribed_ids
+
+async def get_user_subscriptions(session, user_id):
+    """Return the set of product ids a user is subscribed to, waiting for any toggle in progress"""
+    async with user_lock(user_id):
+        return await load_user_subscriptions(session, user_id)
+
+async def get_catalog_product(session, product_id):
+    """Return a product from the cached product list, or None if it is unknown"""
+    await get_catalog(session)
+    return _catalog_cache["by_id"].get(product_id)
+
+async def get_catalog_categories(session):
+    """Return the cached product list and its categorize_products result, which callers must not modify"""
+    products = await get_catalog(session)
+    if _catalog_cache["categories"] is None:
+        _catalog_cache["categories"] = categorize_products(products)
+        _catalog_cache["keyboard"] = build_categories_keyboard(_catalog_cache["categories"])
+        _catalog_cache["stock_body"] = None
+    return products, _catalog_cache["categories"]
+
+async def get_categories_keyboard(session):
+    """Return the cached product list and its category buttons, None when no category has products"""
+    products, _ = await get_catalog_categories(session)
+    return products, _catalog_cache["keyboard"]
+
+async def render_message(render, item_count, *args):
+    """Call render(*args), in a worker thread when the message lists many items so the event loop keeps serving updates"""
+    if item_count <= RENDER_IN_EXECUTOR_THRESHOLD:
+        return render(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, render, *args)
+
+def build_categories_keyboard(categories):
+    """Build category buttons with (available/total) counts, None when no category has products"""
+    keyboard = []
+    for category_name, category_data in categories.items():
+        # Count available and total products in category in one pass
+        total_products = available_count = 0
+        for variants in category_data['variants'].values():
+            total_products += len(variants)
+            available_count += sum(product.available for _, product in variants)
+        
+        if total_products > 0:  # Only show categories that have products
+            status_icon = "🟢" if available_count > 0 else "🔴"
+            button = InlineKeyboardButton(
+                f"{category_data['emoji']} {category_name} {status_icon} ({available_count}/{total_products})",
+                callback_data=f"category_{category_name.replace(' ', '_')}"
+            )
+            keyboard.append([button])
+    
+    return InlineKeyboardMarkup(keyboard) if keyboard else None
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE, session):
     """Send welcome message and store user"""
     user_id = str(update.effective_user.id)
@@ -34,12 +257,8 @@ Use /products to see available products and subscribe to stock notifications.
 async def list_products(update: Update, context: ContextTypes.DEFAULT_TYPE, session):
     """Show product categories"""
     try:
-        # First try to get products from database
-        products_query = select(Product).options(
-            selectinload(Product.subscriptions)
-        )
-        result = await session.execute(products_query)
-        products = result.scalars().all()
+        # First try to get products and the category buttons from the cache
+        products, reply_markup = await get_categories_keyboard(session)
         
         # If no products in database, fetch from API and save
         if not products:
@@ -53,43 +272,26 @@ async def list_products(update: Update, context: ContextTypes.DEFAULT_TYPE, sess
                 )
                 return
             
+            # Save every product with a single upsert, a stock check may have inserted some meanwhile
+            now_utc = utc_now()
+            rows = []
             for api_product in api_products:
-                product = create_product_from_api(api_product)
-                session.add(product)
-                products.append(product)
+                row = get_product_values(api_product)
+                row["last_checked"] = now_utc
+                rows.append(row)
+                products.append(Product(**row))
             
+            await upsert_products(session, rows, PRODUCT_REFRESH_COLUMNS)
             await session.commit()
+            invalidate_catalog_cache()
             logger.info(f"Added {len(products)} products to database")
-        
-        # Categorize products to get counts
-        categories = categorize_products(products)
-        
-        # Create keyboard with category buttons
-        keyboard = []
-        for category_name, category_data in categories.items():
-            # Count available and total products in category
-            total_products = sum(len(variants) for variants in category_data['variants'].values())
-            available_count = 0
-            for variants in category_data['variants'].values():
-                for product_info in variants:
-                    if "🟢 In Stock" in product_info:
-                        available_count += 1
             
-            if total_products > 0:  # Only show categories that have products
-                status_icon = "🟢" if available_count > 0 else "🔴"
-                button = InlineKeyboardButton(
-                    f"{category_data['emoji']} {category_name} {status_icon} ({available_count}/{total_products})",
-                    callback_data=f"category_{category_name.replace(' ', '_')}"
-                )
-                keyboard.append([button])
+            # Categorize products to get counts
+            reply_markup = build_categories_keyboard(categorize_products(products))
         
-        if keyboard:
-            reply_markup = InlineKeyboardMarkup(keyboard)
+        if reply_markup:
             await update.message.reply_text(
-                "🛒 <b>Product Categories</b>\n\n"
-                "📱 Select a category to view products and subscribe\n"
-                "🟢 = Has available items | 🔴 = All out of stock\n"
-                "Numbers show (available/total) products",
+                CATEGORIES_MESSAGE,
                 reply_markup=reply_markup,
                 parse_mode=constants.ParseMode.HTML
             )
@@ -126,38 +328,46 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, se
     if query.data.startswith("toggle_"):
         product_id = query.data.replace("toggle_", "")
         
-        # Get current product status
-        product_query = select(Product).where(Product.id == product_id)
-        product = await session.scalar(product_query)
+        # Get current product status from the shared product list
+        product = await get_catalog_product(session, product_id)
         
         if not product:
             await query.edit_message_text("Error: Product not found.")
             return
         
-        # Check existing subscription
-        sub_query = select(Subscription).where(
-            Subscription.user_id == user_id,
-            Subscription.product_id == product_id
-        )
-        subscription = await session.scalar(sub_query)
-        
-        if subscription:
-            # Unsubscribe
-            await session.delete(subscription)
-            message = f"❌ <b>Unsubscribed from:</b>\n{product.name}\n\n📵 You won't receive notifications for this product anymore."
-            logger.info(f"User {user_id} unsubscribed from product {product_id}")
-        else:
-            # Subscribe with current stock status
-            subscription = Subscription(
-                user_id=user_id,
-                product_id=product_id,
-                last_stock_status=product.available,
-                notified=product.available  # If product is available, mark as notified
-            )
-            session.add(subscription)
+        # One toggle per user at a time so each tap sees the result of the previous one
+        async with user_lock(user_id):
+            # Check existing subscription
+            subscribed_ids = await load_user_subscriptions(session, user_id)
+            
+            # Release the read transaction, the change itself is written by the subscription writer
+            if session.in_transaction():
+                await session.commit()
+            
+            subscribed = product_id in subscribed_ids
+            try:
+                if subscribed:
+                    await queue_subscription_change(user_id, product_id)
+                else:
+                    # The writer records the stock status current when the row is written
+                    await queue_subscription_change(user_id, product_id, {"user_id": user_id, "product_id": product_id})
+            except Exception as e:
+                # The change failed in the subscription writer, a callback query has no message to reply to
+                logger.error(f"Failed to update subscription of user {user_id} to product {product_id}: {e}")
+                await query.edit_message_text("An error occurred while updating your subscription. Please try again later.")
+                return
             
-            status = "🟢 in stock" if product.available else "🔴 out of stock"
-            message = f"""✅ <b>Subscribed to:</b>
+            if subscribed:
+                # Unsubscribe
+                subscribed_ids.discard(product_id)
+                message = f"❌ <b>Unsubscribed from:</b>\n{product.name}\n\n📵 You won't receive notifications for this product anymore."
+                logger.info(f"User {user_id} unsubscribed from product {product_id}")
+            else:
+                # Subscribe
+                subscribed_ids.add(product_id)
+                
+                status = "🟢 in stock" if product.available else "🔴 out of stock"
+                message = f"""✅ <b>Subscribed to:</b>
 {product.name}
 
 📊 <b>Current Status:</b> {status}
@@ -166,9 +376,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, se
 🔔 <b>You will be notified when:</b>
 • Product comes back in stock (if currently unavailable)
 • Product becomes unavailable (if currently in stock)"""
-            logger.info(f"User {user_id} subscribed to product {product_id}")
+                logger.info(f"User {user_id} subscribed to product {product_id}")
         
-        await session.commit()
         await query.edit_message_text(text=message, parse_mode=constants.ParseMode.HTML)
 
 async def show_category_products(query, context: ContextTypes.DEFAULT_TYPE, session, category_name: str):
@@ -176,75 +385,26 @@ async def show_category_products(query, context: ContextTypes.DEFAULT_TYPE, sess
     try:
         user_id = str(query.from_user.id)
         
-        # Get all products
-        products_query = select(Product).options(
-            selectinload(Product.subscriptions)
-        )
-        result = await session.execute(products_query)
-        products = result.scalars().all()
-        
-        # Categorize products
-        categories = categorize_products(products)
+        # Get all products and the ids this user is subscribed to
+        _, categories = await get_catalog_categories(session)
+        subscribed_ids = await get_user_subscriptions(session, user_id)
         
         if category_name not in categories:
             await query.edit_message_text("Category not found.")
             return
         
         category_data = categories[category_name]
+        product_count = sum(len(variant_products) for variant_products in category_data['variants'].values())
         
-        # Build product list with numbers
-        message = f"{category_data['emoji']} <b>{category_name}</b>\n\n"
-        
-        # Store products for number selection
-        category_products = []
-        product_number = 1
-        
-        for variant_name, variant_products in category_data['variants'].items():
-            if variant_products:
-                message += f"<b>{variant_name}:</b>\n"
-                
-                for product_info in sorted(variant_products):
-                    # Extract product details from the formatted string
-                    # Format: "🟢 In Stock - pack of X - ₹YYYY - 🛒 Shop"
-                    parts = product_info.split(" - ")
-                    status_icon = "🟢" if "🟢 In Stock" in product_info else "🔴"
-                    
-                    # Find the actual product object
-                    matching_product = None
-                    for product in products:
-                        if f"₹{product.price}" in product_info:
-                            # Additional matching logic based on pack info
-                            name_lower = product.name.lower()
-                            if variant_name.lower() in name_lower or category_name.lower() in name_lower:
-                                matching_product = product
-                                break
-                    
-                    if matching_product:
-                        # Check if user is subscribed
-                        is_subscribed = any(sub.user_id == user_id 
-                                          for sub in matching_product.subscriptions)
-                        sub_icon = " ✅" if is_subscribed else ""
-                        
-                        # Add product link for in-stock items
-                        shop_link = ""
-                        if matching_product.available:
-                            shop_link = f" - <a href=\"https://shop.amul.com/product/{matching_product.alias}\">🛒 Shop</a>"
-                        
-                        message += f"{product_number}. {status_icon} {parts[1]} - ₹{matching_product.price}{sub_icon}{shop_link}\n"
-                        category_products.append(matching_product)
-                        product_number += 1
-                
-                message += "\n"
+        # A copy of the subscribed ids, the cached set may change while a worker thread renders
+        message, category_products = await render_message(
+            render_category, product_count, category_name, category_data, frozenset(subscribed_ids)
+        )
         
         # Store category products in context for number commands
         context.user_data['category_products'] = category_products
         context.user_data['category_name'] = category_name
         
-        message += "─" * 30 + "\n"
-        message += "📱 <b>How to subscribe:</b>\n"
-        message += "• Use buttons below to subscribe/unsubscribe\n\n"
-        message += "🟢 = In Stock | 🔴 = Out of Stock | ✅ = Subscribed"
-        
         # Create keyboard with quick action buttons
         keyboard = []
         
@@ -257,8 +417,7 @@ async def show_category_products(query, context: ContextTypes.DEFAULT_TYPE, sess
             for j in range(2):
                 if i + j < len(category_products):
                     product = category_products[i + j]
-                    is_subscribed = any(sub.user_id == user_id 
-                                      for sub in product.subscriptions)
+                    is_subscribed = product.id in subscribed_ids
                     button_text = f"{'✅' if is_subscribed else '📝'} {i+j+1}"
                     row.append(InlineKeyboardButton(button_text, callback_data=f"toggle_{product.id}"))
             keyboard.append(row)
@@ -270,14 +429,51 @@ async def show_category_products(query, context: ContextTypes.DEFAULT_TYPE, sess
         logger.error(f"Error showing category products: {e}")
         await query.edit_message_text("An error occurred. Please try again.")
 
+def render_category(category_name, category_data, subscribed_ids):
+    """Build the numbered product list for a category, returns the message and the products in display order"""
+    # Build product list with numbers, joined once at the end
+    message_parts = [f"{category_data['emoji']} <b>{category_name}</b>\n\n"]
+    
+    # Store products for number selection
+    category_products = []
+    product_number = 1
+    
+    for variant_name, variant_products in category_data['variants'].items():
+        if variant_products:
+            message_parts.append(f"<b>{variant_name}:</b>\n")
+            
+            for _, product in variant_products:
+                status_icon = "🟢" if product.available else "🔴"
+                
+                # Check if user is subscribed
+                is_subscribed = product.id in subscribed_ids
+                sub_icon = " ✅" if is_subscribed else ""
+                
+                # Add product link for in-stock items
+                shop_link = ""
+                if product.available:
+                    shop_link = f" - <a href=\"https://shop.amul.com/product/{product.alias}\">🛒 Shop</a>"
+                
+                message_parts.append(f"{product_number}. {status_icon} {product.pack_info} - ₹{product.price}{sub_icon}{shop_link}\n")
+                category_products.append(product)
+                product_number += 1
+            
+            message_parts.append("\n")
+    
+    message_parts.append(MESSAGE_SEPARATOR)
+    message_parts.append("📱 <b>How to subscribe:</b>\n")
+    message_parts.append("• Use buttons below to subscribe/unsubscribe\n\n")
+    message_parts.append("🟢 = In Stock | 🔴 = Out of Stock | ✅ = Subscribed")
+    return "".join(message_parts), category_products
+
 async def my_subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE, session):
     """Show user's subscribed products with detailed status"""
     user_id = str(update.effective_user.id)
     
-    # Get all user's subscriptions with products
+    # Get all user's subscriptions with their products in one round-trip
     subs_query = select(Subscription).where(
         Subscription.user_id == user_id
-    ).options(selectinload(Subscription.product))
+    ).options(joinedload(Subscription.product), raiseload("*"))
     
     result = await session.execute(subs_query)
     subscriptions = result.scalars().all()
@@ -289,6 +485,11 @@ async def my_subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE, s
         )
         return
     
+    message = await render_message(render_subscriptions, len(subscriptions), subscriptions)
+    await update.message.reply_text(message, parse_mode=constants.ParseMode.HTML)
+
+def render_subscriptions(subscriptions):
+    """Build the /mysubscriptions message from subscriptions with their products loaded"""
     # Group subscriptions by notification status
     waiting_for_stock = []
     waiting_for_restock = []  # Products that were in stock but went out
@@ -296,7 +497,7 @@ async def my_subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE, s
     
     for sub in subscriptions:
         product = sub.product
-        status = "🟢 In Stock" if product.available else "🔴 Out of Stock"
+        status = STOCK_STATUS_IN if product.available else STOCK_STATUS_OUT
         price = f"₹{product.price}"
         
         subscription_info = f"• {product.name} - {price}\n  Status: {status}"
@@ -316,30 +517,27 @@ async def my_subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE, s
         else:
             waiting_for_stock.append(subscription_info)  # Never been in stock
     
-    message = "📬 <b>Your Subscriptions</b>\n\n"
+    message_parts = ["📬 <b>Your Subscriptions</b>\n\n"]
     
     if waiting_for_stock:
-        message += "<b>🔄 Waiting for Stock:</b>\n" + "\n\n".join(waiting_for_stock) + "\n\n"
+        message_parts.extend(("<b>🔄 Waiting for Stock:</b>\n", "\n\n".join(waiting_for_stock), "\n\n"))
     
     if waiting_for_restock:
-        message += "<b>⏳ Waiting for Restock:</b>\n" + "\n\n".join(waiting_for_restock) + "\n\n"
+        message_parts.extend(("<b>⏳ Waiting for Restock:</b>\n", "\n\n".join(waiting_for_restock), "\n\n"))
         
     if currently_in_stock:
-        message += "<b>✅ Currently Available:</b>\n" + "\n\n".join(currently_in_stock) + "\n\n"
-    
-    message += "─" * 30 + "\n"
-    message += "ℹ️ You will be notified when products come back in stock.\n"
-    message += "📱 Use /products to manage your subscriptions."
+        message_parts.extend(("<b>✅ Currently Available:</b>\n", "\n\n".join(currently_in_stock), "\n\n"))
     
-    await update.message.reply_text(message, parse_mode=constants.ParseMode.HTML)
+    message_parts.append(MESSAGE_SEPARATOR)
+    message_parts.append("ℹ️ You will be notified when products come back in stock.\n")
+    message_parts.append("📱 Use /products to manage your subscriptions.")
+    return "".join(message_parts)
 
 async def stock(update: Update, context: ContextTypes.DEFAULT_TYPE, session):
     """Show current stock status of all products"""
     try:
-        # Get all products ordered by name
-        products_query = select(Product).order_by(Product.name)
-        result = await session.execute(products_query)
-        products = result.scalars().all()
+        # Get all products grouped into categories
+        products, categories = await get_catalog_categories(session)
         
         if not products:
             await update.message.reply_text(
@@ -347,12 +545,16 @@ async def stock(update: Update, context: ContextTypes.DEFAULT_TYPE, session):
             )
             return
         
-        # Get last update time
-        last_check_time = max((p.last_checked for p in products if p.last_checked), default=None)
+        # The product listing is reused until the catalog changes, cache it before awaiting anything else
+        if _catalog_cache["stock_body"] is None:
+            _catalog_cache["stock_body"] = format_stock_body(categories)
+        body = _catalog_cache["stock_body"]
+        
+        # Get last update time, it changes every check so it is read fresh from the database
+        last_check_time = await session.scalar(select(func.max(Product.last_checked)))
         
-        # Categorize and format message
-        categories = categorize_products(products)
-        message = format_stock_message(categories, last_check_time, CHECK_INTERVAL)
+        # Format message
+        message = format_stock_message(categories, last_check_time, CHECK_INTERVAL, body)
         
         await update.message.reply_text(message, parse_mode=constants.ParseMode.HTML)
         
@@ -365,42 +567,12 @@ async def stock(update: Update, context: ContextTypes.DEFAULT_TYPE, session):
 async def show_categories_again(query, context: ContextTypes.DEFAULT_TYPE, session):
     """Show product categories again"""
     try:
-        # Get all products
-        products_query = select(Product).options(
-            selectinload(Product.subscriptions)
-        )
-        result = await session.execute(products_query)
-        products = result.scalars().all()
-        
-        # Categorize products to get counts
-        categories = categorize_products(products)
-        
-        # Create keyboard with category buttons
-        keyboard = []
-        for category_name, category_data in categories.items():
-            # Count available and total products in category
-            total_products = sum(len(variants) for variants in category_data['variants'].values())
-            available_count = 0
-            for variants in category_data['variants'].values():
-                for product_info in variants:
-                    if "🟢 In Stock" in product_info:
-                        available_count += 1
-            
-            if total_products > 0:  # Only show categories that have products
-                status_icon = "🟢" if available_count > 0 else "🔴"
-                button = InlineKeyboardButton(
-                    f"{category_data['emoji']} {category_name} {status_icon} ({available_count}/{total_products})",
-                    callback_data=f"category_{category_name.replace(' ', '_')}"
-                )
-                keyboard.append([button])
+        # Category buttons are shared by all users until the catalog changes
+        _, reply_markup = await get_categories_keyboard(session)
         
-        if keyboard:
-            reply_markup = InlineKeyboardMarkup(keyboard)
+        if reply_markup:
             await query.edit_message_text(
-                "🛒 <b>Product Categories</b>\n\n"
-                "📱 Select a category to view products and subscribe\n"
-                "🟢 = Has available items | 🔴 = All out of stock\n"
-                "Numbers show (available/total) products",
+                CATEGORIES_MESSAGE,
                 reply_markup=reply_markup,
                 parse_mode=constants.ParseMode.HTML
             )
@@ -411,11 +583,11 @@ async def show_categories_again(query, context: ContextTypes.DEFAULT_TYPE, sessi
         logger.error(f"Error showing categories: {e}")
         await query.edit_message_text("An error occurred. Please try again.")
 
-async def send_notification(context: ContextTypes.DEFAULT_TYPE, product: Product, user_id: str, is_available=True, duration_info=None):
-    """Send Telegram notification to a subscribed user"""
+async def send_notification(context: ContextTypes.DEFAULT_TYPE, product: Product, user_id: str, is_available=True, duration_info=None, message_data=None):
+    """Send Telegram notification to a subscribed user, message_data can be a format_notification_message result shared by a broadcast"""
     try:
-        from utils import format_notification_message
-        message_data = format_notification_message(product, is_available, duration_info)
+        if message_data is None:
+            message_data = format_notification_message(product, is_available, duration_info)
         
         if message_data['photo']:
             # Send photo with caption
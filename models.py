@@ -1,5 +1,5 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, MetaData
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, MetaData
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -11,6 +11,10 @@ metadata = MetaData(naming_convention=convention)
 
 Base = declarative_base(metadata=metadata)
 
+def utc_now():
+    """Current UTC time as a naive datetime, the form all DateTime columns store"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class Product(Base):
     """Product information"""
     __tablename__ = 'products'
@@ -21,12 +25,15 @@ class Product(Base):
     sku = Column(String)
     alias = Column(String)
     available = Column(Boolean, default=False)
-    last_checked = Column(DateTime, default=datetime.utcnow)
+    last_checked = Column(DateTime, default=utc_now)
     last_stock_change = Column(DateTime, nullable=True)  # When stock status last changed
     last_in_stock_at = Column(DateTime, nullable=True)   # When it was last in stock
     last_out_of_stock_at = Column(DateTime, nullable=True)  # When it went out of stock
     image_url = Column(String, nullable=True)  # Product image URL
     file_base_url = Column(String, nullable=True)  # Base URL for images
+    category = Column(String, nullable=True)  # Category, variant and pack info derived from the name
+    variant = Column(String, nullable=True)
+    pack_info = Column(String, nullable=True)
     subscriptions = relationship("Subscription", back_populates="product")
 
 class User(Base):
@@ -34,17 +41,24 @@ class User(Base):
     __tablename__ = 'users'
     
     id = Column(String, primary_key=True)
-    first_seen = Column(DateTime, default=datetime.utcnow)
+    first_seen = Column(DateTime, default=utc_now)
     subscriptions = relationship("Subscription", back_populates="user")
 
 class Subscription(Base):
     """Product subscriptions for users"""
     __tablename__ = 'subscriptions'
+    __table_args__ = (
+        # Stock checks look subscriptions up by product, the covering columns only apply on PostgreSQL
+        Index('ix_sub_product_user', 'product_id', 'user_id',
+              postgresql_include=['last_stock_status', 'notified', 'last_notified_at']),
+        # Subscription toggles and /mysubs look them up by user, a user subscribes to a product once
+        Index('ix_sub_user_product', 'user_id', 'product_id', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(String, ForeignKey('users.id'), nullable=False)
     product_id = Column(String, ForeignKey('products.id'), nullable=False)
-    subscribed_at = Column(DateTime, default=datetime.utcnow)
+    subscribed_at = Column(DateTime, default=utc_now)
     last_notified_at = Column(DateTime, nullable=True)  # When was the last notification sent
     notified = Column(Boolean, default=False)  # Has current stock status been notified
     last_stock_status = Column(Boolean, default=False)  # Last known stock status
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# config.py reads these at import time, so they must be set before bot or handlers is imported
+os.environ.setdefault("BOT_TOKEN", "test-token")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+# The bot modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
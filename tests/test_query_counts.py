@@ -0,0 +1,109 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot
+import handlers
+from models import Base, Product, Subscription, User
+from _query_counter import count_queries
+
+USER_ID = "1001"
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+class FakeQuery:
+    def __init__(self, user_id):
+        self.from_user = SimpleNamespace(id=int(user_id))
+        self.edits = []
+
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+def make_product(index, name, category, variant, available):
+    return Product(
+        id=f"p{index}", name=name, price=100 + index, sku=f"SKU{index}", alias=f"alias-{index}",
+        available=available, category=category, variant=variant, pack_info="pack of 30"
+    )
+
+
+async def seed():
+    async with bot.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    products = [
+        make_product(1, "Amul Whey Protein | Pack of 30", "Whey Protein", "Unflavoured", True),
+        make_product(2, "Amul Chocolate Whey Protein | Pack of 30", "Whey Protein", "Chocolate", False),
+        make_product(3, "Amul Kool Protein Milkshake | Coffee | Pack of 30", "Protein Shakes", "Coffee", True),
+        make_product(4, "Amul High Protein Milk | Pack of 30", "Protein Drinks", "Milk", False),
+    ]
+    async with bot.async_session() as session:
+        session.add(User(id=USER_ID))
+        session.add_all(products)
+        await session.flush()
+        session.add_all(
+            Subscription(user_id=USER_ID, product_id=product.id, last_stock_status=product.available)
+            for product in products
+        )
+        await session.commit()
+
+    # Start every test with cold caches
+    handlers.invalidate_catalog_cache()
+    handlers._user_subscriptions.clear()
+
+
+def run(coro):
+    async def wrapped():
+        try:
+            await seed()
+            return await coro()
+        finally:
+            await bot.engine.dispose()
+    return asyncio.run(wrapped())
+
+
+@pytest.fixture
+def context():
+    return SimpleNamespace(user_data={}, bot_data={})
+
+
+def test_show_category_products_statement_count(context):
+    async def scenario():
+        query = FakeQuery(USER_ID)
+        async with bot.async_session() as session:
+            with count_queries(bot.engine.sync_engine) as cold:
+                await handlers.show_category_products(query, context, session, "Whey Protein")
+            with count_queries(bot.engine.sync_engine) as warm:
+                await handlers.show_category_products(query, context, session, "Whey Protein")
+        return query, cold, warm
+
+    query, cold, warm = run(scenario)
+
+    assert "Whey Protein" in query.edits[0]
+    # Product list and the user's subscriptions, both cached afterwards
+    assert len(cold) <= 2, cold
+    assert len(warm) == 0, warm
+
+
+def test_my_subscriptions_statement_count(context):
+    async def scenario():
+        update = SimpleNamespace(effective_user=SimpleNamespace(id=int(USER_ID)), message=FakeMessage())
+        async with bot.async_session() as session:
+            with count_queries(bot.engine.sync_engine) as queries:
+                await handlers.my_subscriptions(update, context, session)
+        return update, queries
+
+    update, queries = run(scenario)
+
+    assert "Your Subscriptions" in update.message.replies[0]
+    # Subscriptions and their products in one round-trip, no per-product lazy loads
+    assert len(queries) == 1, queries
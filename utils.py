@@ -1,77 +1,162 @@
 from datetime import datetime, timedelta
-import pytz
+from functools import lru_cache, wraps
+from operator import itemgetter
+import re
+import time
 import logging
-from models import Product
+from zoneinfo import ZoneInfo
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Product, Subscription
 from config import PRODUCT_CATEGORIES, CHECK_INTERVAL_PEAK, CHECK_INTERVAL_NORMAL, DOWNTIME_START_HOUR, DOWNTIME_END_HOUR, PEAK_START_HOUR, PEAK_END_HOUR
 
 logger = logging.getLogger(__name__)
 
 # Always use Asia/Kolkata timezone for scheduling (Amul is Indian company)
-IST = pytz.timezone('Asia/Kolkata')
+IST = ZoneInfo('Asia/Kolkata')
+
+# Seconds schedule helpers reuse their result, the schedule only changes on the hour
+SCHEDULE_CACHE_TTL = 30
+
+# (category, emoji, variant names) read once from PRODUCT_CATEGORIES
+CATEGORY_SCHEMA = tuple(
+    (category_name, category_data['emoji'], tuple(category_data['variants']))
+    for category_name, category_data in PRODUCT_CATEGORIES.items()
+)
+
+# Fragments of the per-product line in stock listings
+STOCK_STATUS_IN = "🟢 In Stock"
+STOCK_STATUS_OUT = "🔴 Out of Stock"
+SHOP_PRODUCT_URL = "https://shop.amul.com/en/product/"
+
+# Line between a listing and its footer in bot messages
+MESSAGE_SEPARATOR = "─" * 30 + "\n"
+
+# First lines of the /stock message
+STOCK_MESSAGE_HEADER = "📊 <b>Product Categories</b>\n\n🛒 <i>Click 'Shop' links to buy in-stock items</i>\n\n"
+
+# Message sent to subscribers when a product's stock changes
+NOTIFICATION_TEMPLATE = """{status_emoji} <b>Stock Update!</b>
+
+<b>{name}</b>
+📊 Status: <b>{status_text}</b>
+💰 Price: <b>₹{price}</b>
+🏷️ SKU: <code>{sku}</code>{duration_text}
+
+📍 You are receiving this notification because you subscribed to stock updates for this product.
+
+{action_text}"""
+
+# Message posted to the notification channel when a product's stock changes
+CHANNEL_NOTIFICATION_TEMPLATE = """{status_emoji} <b>{status_text}</b>
+
+<b>{name}</b>
+💰 Price: ₹{price}
+🏷️ SKU: {sku}{duration_text}
+
+🕐 Updated: {updated}
+
+🛒 <a href="https://shop.amul.com/en/product/{alias}">Shop Link</a>"""
+
+# Required fields of an API product, fetched in one call
+API_PRODUCT_FIELDS = itemgetter('_id', 'name', 'price', 'sku', 'alias', 'available')
+
+# Dialect specific INSERT constructs that support ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+# Product names whose classification is remembered, the catalog is far smaller
+CLASSIFY_CACHE_SIZE = 1024
+
+# (keyword, category, ((variant keyword, variant), ...), default variant), the first rule whose keyword is found wins
+# The last rule has no keyword and catches everything else, "milkshake" counts as shake and "buttermilk" as milk
+CLASSIFY_RULES = (
+    ('whey protein', 'Whey Protein', (('chocolate', 'Chocolate'),), 'Unflavoured'),
+    ('shake', 'Protein Shakes', (('chocolate', 'Chocolate'), ('coffee', 'Coffee'), ('blueberry', 'Blueberry')), 'Kesar'),
+    ('paneer', 'Paneer', (), 'Regular'),
+    (None, 'Protein Drinks', (('milk', 'Milk'), ('rose lassi', 'Rose Lassi')), 'Plain Lassi'),
+)
+
+# Keywords classify_product looks for, none is a prefix of another so every occurrence is reported
+CLASSIFY_KEYWORDS = tuple(dict.fromkeys(
+    keyword
+    for category_keyword, _, variant_rules, _ in CLASSIFY_RULES
+    for keyword in (category_keyword, *(variant_keyword for variant_keyword, _ in variant_rules))
+    if keyword
+))
+
+# Zero-width lookahead so one scan finds every keyword, even where two overlap
+KEYWORD_PATTERN = re.compile("(?=(" + "|".join(map(re.escape, CLASSIFY_KEYWORDS)) + "))")
+
+# The first "|" separated part of a lowercased name that mentions the pack size
+PACK_PATTERN = re.compile(r"(?:^|\|)([^|]*pack of[^|]*)")
 
 def get_ist_time():
     """Get current time in IST timezone"""
     return datetime.now(IST)
 
+def schedule_cached(func):
+    """Cache a schedule helper's result for SCHEDULE_CACHE_TTL seconds"""
+    cached = lru_cache(maxsize=1)(lambda bucket: func())
+    
+    @wraps(func)
+    def wrapper():
+        return cached(int(time.monotonic() // SCHEDULE_CACHE_TTL))
+    return wrapper
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
+def classify_product(name):
+    """Return (category, variant, pack_info) for a product name"""
+    name = name.lower()
+    
+    # Extract pack info
+    match = PACK_PATTERN.search(name)
+    pack_info = match.group(1).strip() if match else ""
+    
+    # Find all keywords in a single scan
+    hits = set(KEYWORD_PATTERN.findall(name))
+    
+    # Categorize product with the first matching rule
+    for category_keyword, category, variant_rules, default_variant in CLASSIFY_RULES:
+        if category_keyword is None or category_keyword in hits:
+            break
+    variant = next((variant for variant_keyword, variant in variant_rules if variant_keyword in hits), default_variant)
+    
+    return category, variant, pack_info
+
 def categorize_products(products):
-    """Group products by category and variants"""
-    # Create a deep copy to avoid shared references to variant lists
-    categories = {}
-    for category_name, category_data in PRODUCT_CATEGORIES.items():
-        categories[category_name] = {
-            'emoji': category_data['emoji'],
-            'variants': {variant: [] for variant in category_data['variants']}
-        }
+    """Group products by category and variants as (product_info, product) pairs sorted by product_info"""
+    # Fresh variant lists for every call, the config dict is never shared
+    categories = {
+        category_name: {'emoji': emoji, 'variants': {variant: [] for variant in variants}}
+        for category_name, emoji, variants in CATEGORY_SCHEMA
+    }
+    
+    # Bound append of every variant list, one lookup per product instead of walking the nested dicts
+    appenders = {
+        (category_name, variant): variant_products.append
+        for category_name, category_data in categories.items()
+        for variant, variant_products in category_data['variants'].items()
+    }
     
     for product in products:
-        name = product.name.lower()
-        status = "🟢 In Stock" if product.available else "🔴 Out of Stock"
-        price = f"₹{product.price}"
-        
-        # Extract pack info
-        pack_info = ""
-        if "pack of" in name:
-            for part in name.split("|"):
-                if "pack of" in part.lower():
-                    pack_info = part.strip()
-                    break
-        
         # Add product link for in-stock items
         if product.available:
-            product_link = f"https://shop.amul.com/en/product/{product.alias}"
-            product_info = f"{status} - {pack_info} - {price} - <a href=\"{product_link}\">🛒 Shop</a>"
-        else:
-            product_info = f"{status} - {pack_info} - {price}"
-        
-        # Categorize product
-        if "whey protein" in name:
-            category = 'Whey Protein'
-            variant = 'Chocolate' if 'chocolate' in name else 'Unflavoured'
-        elif "milkshake" in name or "shake" in name:
-            category = 'Protein Shakes'
-            if 'chocolate' in name:
-                variant = 'Chocolate'
-            elif 'coffee' in name:
-                variant = 'Coffee'
-            elif 'blueberry' in name:
-                variant = 'Blueberry'
-            else:
-                variant = 'Kesar'
-        elif "paneer" in name:
-            category = 'Paneer'
-            variant = 'Regular'
+            product_info = "".join((
+                STOCK_STATUS_IN, " - ", product.pack_info, " - ₹", str(product.price),
+                " - <a href=\"", SHOP_PRODUCT_URL, product.alias, "\">🛒 Shop</a>"
+            ))
         else:
-            category = 'Protein Drinks'
-            if 'milk' in name and 'shake' not in name:
-                variant = 'Milk'
-            elif 'buttermilk' in name:
-                variant = 'Buttermilk'
-            elif 'rose lassi' in name:
-                variant = 'Rose Lassi'
-            else:
-                variant = 'Plain Lassi'
+            product_info = "".join((STOCK_STATUS_OUT, " - ", product.pack_info, " - ₹", str(product.price)))
         
-        categories[category]['variants'][variant].append(product_info)
+        # Classification is stored on the product when it is written
+        appenders[product.category, product.variant]((product_info, product))
+    
+    # Sort each variant once here so callers can render the lists as they are
+    for category_data in categories.values():
+        for variant_products in category_data['variants'].values():
+            variant_products.sort(key=itemgetter(0))
     
     return categories
 
@@ -97,16 +182,10 @@ def format_notification_message(product, is_available=True, duration_info=None):
             duration_text = ""
     
     return {
-        'text': f"""{status_emoji} <b>Stock Update!</b>
-
-<b>{product.name}</b>
-📊 Status: <b>{status_text}</b>
-💰 Price: <b>₹{product.price}</b>
-🏷️ SKU: <code>{product.sku}</code>{duration_text}
-
-📍 You are receiving this notification because you subscribed to stock updates for this product.
-
-{action_text}""",
+        'text': NOTIFICATION_TEMPLATE.format(
+            status_emoji=status_emoji, name=product.name, status_text=status_text, price=product.price,
+            sku=product.sku, duration_text=duration_text, action_text=action_text
+        ),
         'photo': product.image_url
     }
 
@@ -136,51 +215,60 @@ def format_channel_notification(product, is_available=True, duration_info=None,
             duration_text = ""
     
     return {
-        'text': f"""{status_emoji} <b>{status_text}</b>
-
-<b>{product.name}</b>
-💰 Price: ₹{product.price}
-🏷️ SKU: {product.sku}{duration_text}
-
-🕐 Updated: {now_ist.strftime('%d %b %Y, %H:%M IST')}
-
-🛒 <a href="https://shop.amul.com/en/product/{product.alias}">Shop Link</a>""",
+        'text': CHANNEL_NOTIFICATION_TEMPLATE.format(
+            status_emoji=status_emoji, status_text=status_text, name=product.name, price=product.price,
+            sku=product.sku, duration_text=duration_text, updated=now_ist.strftime('%d %b %Y, %H:%M IST'),
+            alias=product.alias
+        ),
         'photo': product.image_url
     }
 
-def format_stock_message(categories, last_check_time=None, check_interval=300):
-    """Format stock status message with categories"""
-    message = "📊 <b>Product Categories</b>\n\n"
-    message += "🛒 <i>Click 'Shop' links to buy in-stock items</i>\n\n"
+def format_stock_message(categories, last_check_time=None, check_interval=300, body=None):
+    """Format stock status message with categories, body can be a format_stock_body result to reuse"""
+    if body is None:
+        body = format_stock_body(categories)
+    return body + format_stock_footer(last_check_time)
+
+def format_stock_body(categories):
+    """Format the product listing part of the stock message, it only changes with the products"""
+    # Nothing to list, the header is the whole body
+    if not any(products for category_data in categories.values() for products in category_data['variants'].values()):
+        return STOCK_MESSAGE_HEADER
+    
+    # Collect the message parts and join them once at the end
+    message_parts = [STOCK_MESSAGE_HEADER]
     
     for category_name, category_data in categories.items():
-        has_products = False
-        category_text = []
+        # Skip empty categories before building any of their text
+        variants = [(variant, products) for variant, products in category_data['variants'].items() if products]
+        if not variants:
+            continue
         
         # Add category header with bold formatting
-        category_text.append(f"<b>{category_data['emoji']} {category_name}</b>\n")
+        category_text = [f"<b>{category_data['emoji']} {category_name}</b>\n"]
         
         # Add variants with products
-        for variant, products in category_data['variants'].items():
-            if products:
-                has_products = True
-                category_text.append(f"<b>{variant}:</b>")
-                category_text.extend(f"• {p}" for p in sorted(products))
-                category_text.append("")  # Add empty line after each variant
+        for variant, products in variants:
+            category_text.append(f"<b>{variant}:</b>")
+            category_text.extend(f"• {product_info}" for product_info, _ in products)
+            category_text.append("")  # Add empty line after each variant
         
-        if has_products:
-            message += "\n".join(category_text) + "\n"
+        message_parts.extend(("\n".join(category_text), "\n"))
     
+    return "".join(message_parts)
+
+def format_stock_footer(last_check_time=None):
+    """Format the last update time and schedule part of the stock message"""
     # Add timing information with better formatting
-    message += "─" * 30 + "\n"
+    message_parts = [MESSAGE_SEPARATOR]
     if last_check_time:
-        message += f"🕐 <b>Last updated:</b> {last_check_time.strftime('%Y-%m-%d %H:%M')}\n"
+        message_parts.append(f"🕐 <b>Last updated:</b> {last_check_time.strftime('%Y-%m-%d %H:%M')}\n")
     
     # Show current schedule info
     schedule_info = get_schedule_info()
-    message += f"📅 <b>Schedule:</b> {schedule_info}"
+    message_parts.append(f"📅 <b>Schedule:</b> {schedule_info}")
     
-    return message
+    return "".join(message_parts)
 
 def get_product_image_url(api_product):
     """Extract and format product image URL from API data"""
@@ -197,25 +285,63 @@ def get_product_image_url(api_product):
     
     return None
 
-def create_product_from_api(api_product):
-    """Create Product instance from API data"""
+def get_product_values(api_product):
+    """Extract Product column values from API data"""
+    product_id, name, price, sku, alias, available = API_PRODUCT_FIELDS(api_product)
     image_url = get_product_image_url(api_product)
+    category, variant, pack_info = classify_product(name)
+    
+    return {
+        'id': product_id,
+        'name': name,
+        'price': price,
+        'sku': sku,
+        'alias': alias,
+        'available': available == 1,
+        'image_url': image_url,
+        'file_base_url': api_product.get('fileBaseUrl', ''),
+        'category': category,
+        'variant': variant,
+        'pack_info': pack_info
+    }
+
+async def upsert_products(session, rows, update_columns):
+    """Insert product rows in one statement, updating update_columns for existing ids"""
+    insert = UPSERT_INSERTS.get(session.bind.dialect.name)
+    if insert is None:
+        # Databases without ON CONFLICT support fall back to a merge per row
+        for row in rows:
+            await session.merge(Product(**row))
+        return
     
-    return Product(
-        id=api_product['_id'],
-        name=api_product['name'],
-        price=api_product['price'],
-        sku=api_product['sku'],
-        alias=api_product['alias'],
-        available=api_product['available'] == 1,
-        image_url=image_url,
-        file_base_url=api_product.get('fileBaseUrl', '')
+    stmt = insert(Product).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.id],
+        set_={column: stmt.excluded[column] for column in update_columns}
     )
+    await session.execute(stmt)
+
+async def insert_subscriptions(session, rows):
+    """Insert subscription rows in one statement, skipping user/product pairs that already exist"""
+    insert = UPSERT_INSERTS.get(session.bind.dialect.name)
+    if insert is None:
+        # Databases without ON CONFLICT support fall back to one add per row
+        session.add_all(Subscription(**row) for row in rows)
+        return
+    
+    stmt = insert(Subscription).values(rows)
+    stmt = stmt.on_conflict_do_nothing(index_elements=[Subscription.user_id, Subscription.product_id])
+    await session.execute(stmt)
+
+@schedule_cached
+def get_ist_hour():
+    """Get the current hour in IST, shared by the schedule helpers"""
+    return get_ist_time().hour
 
+@schedule_cached
 def get_current_check_interval():
     """Get the appropriate check interval based on current IST time"""
-    now = get_ist_time()
-    current_hour = now.hour
+    current_hour = get_ist_hour()
     
     # Check if we're in downtime (12am - 6am IST)
     if DOWNTIME_START_HOUR <= current_hour < DOWNTIME_END_HOUR:
@@ -229,9 +355,10 @@ def get_current_check_interval():
     else:
         return CHECK_INTERVAL_NORMAL  # 10 minutes
 
+@schedule_cached
 def is_downtime():
     """Check if current IST time is within downtime hours"""
-    current_hour = get_ist_time().hour
+    current_hour = get_ist_hour()
     return DOWNTIME_START_HOUR <= current_hour < DOWNTIME_END_HOUR
 
 def get_next_active_time():
@@ -239,12 +366,9 @@ def get_next_active_time():
     now = get_ist_time()
     
     if is_downtime():
-        # If we're in downtime, next active time is at DOWNTIME_END_HOUR today
-        next_active = now.replace(hour=DOWNTIME_END_HOUR, minute=0, second=0, microsecond=0)
-        if next_active <= now:
-            # If that time has passed, it's tomorrow
-            next_active += timedelta(days=1)
-        return next_active
+        # If we're in downtime, next active time is at DOWNTIME_END_HOUR today, or tomorrow once that hour has passed
+        add_days = 1 if now.hour >= DOWNTIME_END_HOUR else 0
+        return (now + timedelta(days=add_days)).replace(hour=DOWNTIME_END_HOUR, minute=0, second=0, microsecond=0)
     
     return now
 
@@ -255,20 +379,20 @@ def format_natural_duration(start_time, end_time):
     
     # Ensure both times are timezone-aware
     if start_time.tzinfo is None:
-        start_time = IST.localize(start_time)
+        start_time = start_time.replace(tzinfo=IST)
     if end_time.tzinfo is None:
-        end_time = IST.localize(end_time)
+        end_time = end_time.replace(tzinfo=IST)
     
     duration = end_time - start_time
-    total_seconds = int(duration.total_seconds())
     
-    if total_seconds < 0:
+    # A timedelta is normalized so only days can be negative
+    if duration.days < 0:
         return "unknown duration"
     
-    # Calculate time components
-    days = total_seconds // 86400
-    hours = (total_seconds % 86400) // 3600
-    minutes = (total_seconds % 3600) // 60
+    # Calculate time components from the whole days and seconds, no float conversion needed
+    days = duration.days
+    hours, remainder = divmod(duration.seconds, 3600)
+    minutes = remainder // 60
     
     # Format natural language
     parts = []
@@ -279,19 +403,12 @@ def format_natural_duration(start_time, end_time):
     if minutes > 0 and days == 0:  # Only show minutes if less than a day
         parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
     
-    if not parts:
-        return "less than a minute"
-    elif len(parts) == 1:
-        return parts[0]
-    elif len(parts) == 2:
-        return f"{parts[0]} {parts[1]}"
-    else:
-        return f"{parts[0]} {parts[1]} {parts[2]}"
+    return " ".join(parts) or "less than a minute"
 
+@schedule_cached
 def get_schedule_info():
     """Get human-readable schedule information"""
     current_interval = get_current_check_interval()
-    now_ist = get_ist_time()
     
     if current_interval is None:
         next_active = get_next_active_time()